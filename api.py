@@ -3,16 +3,17 @@ FastAPI application that wraps NotesCore functionality for frontend integration.
 """
 
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 import sys
 from pathlib import Path
 
 # Add parent directory to path to import notes_core
 sys.path.append(str(Path(__file__).parent))
-from notes_core import NotesCore, Note as NoteModel
+from notes_core import NotesCore, Note as NoteModel, API_SEARCH_FIELDS, resolve_search_fields
+from config import DEDUP_THRESHOLD, DEDUP_K
 
 # Global NotesCore instance
 notes_core = NotesCore()
@@ -37,13 +38,53 @@ class NoteResponse(NoteBase):
     class Config:
         from_attributes = True
 
+# Mirrors notes_core.SEARCH_FIELDS
+SearchField = Literal["id", "title", "content", "snippet", "created", "updated"]
+
 class QueryRequest(BaseModel):
     question: str
     k: Optional[int] = 5
+    snippet_chars: Optional[int] = Field(None, ge=1)
+    fields: Optional[List[SearchField]] = Field(None, min_length=1)
+
+    @model_validator(mode="after")
+    def check_snippet_chars(self):
+        if self.fields and "snippet" in self.fields and self.snippet_chars is None:
+            raise ValueError("snippet_chars is required to return snippets")
+        return self
+
+class ReferenceResponse(BaseModel):
+    id: Optional[int] = None
+    title: Optional[str] = None
+    content: Optional[str] = None
+    snippet: Optional[str] = None
+    created: Optional[datetime] = None
+    updated: Optional[datetime] = None
 
 class QueryResponse(BaseModel):
     answer: str
-    references: List[NoteResponse]
+    references: List[ReferenceResponse]
+
+class DedupRequest(BaseModel):
+    threshold: float = Field(DEDUP_THRESHOLD, gt=0, le=1)
+    k: int = Field(DEDUP_K, ge=1)
+    # Mirrors notes_core.DEDUP_ACTIONS
+    action: Literal["report", "merge", "delete"] = "report"
+
+class KeptNote(BaseModel):
+    id: int
+    title: Optional[str] = None
+
+class DuplicateNote(KeptNote):
+    similarity: float
+
+class DuplicateCluster(BaseModel):
+    keep: KeptNote
+    duplicates: List[DuplicateNote]
+
+class DedupResponse(BaseModel):
+    action: str
+    clusters: List[DuplicateCluster]
 
 class DeleteResponse(BaseModel):
     message: str
@@ -195,38 +236,40 @@ async def delete_note(note_id: int):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting note: {str(e)}")
 
-@app.post("/query", response_model=QueryResponse)
+@app.post("/query", response_model=QueryResponse, response_model_exclude_none=True)
 async def query_notes(query_request: QueryRequest):
-    """Query notes using semantic search and return answer with references."""
+    """Query notes using semantic search and return answer with references.
+
+    Set snippet_chars to get a preview around the best-matching passage in
+    place of the full content, and fields to choose which keys each
+    reference carries; fields that were not requested are left out.
+    """
     try:
         # Search for relevant notes
-        results = notes_core.search_notes(query_request.question, k=query_request.k)
-        
-        if not results:
-            return QueryResponse(
-                answer="No relevant notes found for your question.",
-                references=[]
-            )
-        
-        # Convert results to NoteResponse objects
-        references = []
-        for result in results:
-            references.append(NoteResponse(
-                id=result['id'],
-                title=result['title'],
-                content=result['content'],
-                created=datetime.utcnow(),  # We don't have these in search results
-                updated=datetime.utcnow()
-            ))
-        
-        # Only return the question as the answer (or you can add a custom answer string)
-        return QueryResponse(
-            answer=f"Query: {query_request.question}",
-            references=references
+        results = notes_core.search_notes(
+            query_request.question,
+            k=query_request.k,
+            fields=resolve_search_fields(
+                query_request.fields,
+                query_request.snippet_chars,
+                default=API_SEARCH_FIELDS
+            ),
+            snippet_chars=query_request.snippet_chars
         )
-        
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error querying notes: {str(e)}")
+        
+    if not results:
+        return {
+            "answer": "No relevant notes found for your question.",
+            "references": []
+        }
+    
+    # Plain dicts are validated and serialized once, by response_model
+    return {
+        "answer": f"Query: {query_request.question}",
+        "references": results
+    }
 
 @app.post("/rebuild-index")
 async def rebuild_index():
@@ -237,6 +280,21 @@ async def rebuild_index():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error rebuilding index: {str(e)}")
 
+@app.post("/dedup", response_model=DedupResponse)
+async def dedup_notes(dedup_request: DedupRequest):
+    """Find near-duplicate notes, optionally merging or deleting them."""
+    try:
+        clusters = notes_core.find_duplicates(
+            threshold=dedup_request.threshold,
+            k=dedup_request.k,
+            action=dedup_request.action
+        )
+        return DedupResponse(action=dedup_request.action, clusters=clusters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error finding duplicates: {str(e)}")
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
@@ -14,4 +14,12 @@ EMBEDDING_DIM = 384  # Dimension of embeddings for the chosen model
 
 # File paths
 NOTES_JSON_PATH = os.path.join(BASE_DIR, "notes.json")
-FAISS_INDEX_PATH = os.path.join(BASE_DIR, "notes_index.faiss") 
\ No newline at end of file
+FAISS_INDEX_PATH = os.path.join(BASE_DIR, "notes_index.faiss")
+
+# Indexing configuration
+ENCODE_BATCH_SIZE = 32  # Texts per model forward pass
+ENCODE_CHUNK_SIZE = 256  # Notes handed to an encoder process at a time
+
+# Duplicate detection configuration
+DEDUP_THRESHOLD = 0.95  # Minimum cosine similarity for two notes to count as duplicates
+DEDUP_K = 10  # Neighbours examined per note
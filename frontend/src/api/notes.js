@@ -45,7 +45,8 @@ export async function askQuestion(question) {
         headers: {
             "Content-Type": "application/json",
         },
-        body: JSON.stringify({ question }),
+        // AskBar only shows a preview, so ask for a snippet instead of full content
+        body: JSON.stringify({ question, snippet_chars: 120 }),
     });
     return response.json();
 }
@@ -34,7 +34,7 @@ function AskBar({ onAsk, answer, references }) {
                                     <li key={ref.id} style={{ marginBottom: '0.5em' }}>
                                         <span style={{ fontWeight: 'bold' }}>{ref.title}</span>
                                         <div style={{ fontSize: '0.95em', color: '#555' }}>
-                                            {ref.content.length > 120 ? ref.content.slice(0, 120) + '...' : ref.content}
+                                            {ref.snippet ?? (ref.content.length > 120 ? ref.content.slice(0, 120) + '...' : ref.content)}
                                         </div>
                                     </li>
                                 ))}
@@ -3,11 +3,15 @@ Notes Core Module - Centralized functionality for notes management, indexing, an
 """
 
 import json
+import multiprocessing
+import re
 import faiss
 import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
 from sentence_transformers import SentenceTransformer
 from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime
 from sqlalchemy.ext.declarative import declarative_base
@@ -16,10 +20,25 @@ from sqlalchemy.orm import sessionmaker
 # Import config from parent directory
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
-from config import DB_URL, MODEL_NAME, EMBEDDING_DIM, FAISS_INDEX_PATH, NOTES_JSON_PATH
+from config import (
+    DB_URL, MODEL_NAME, EMBEDDING_DIM, FAISS_INDEX_PATH, NOTES_JSON_PATH,
+    ENCODE_BATCH_SIZE, ENCODE_CHUNK_SIZE, DEDUP_THRESHOLD, DEDUP_K,
+)
 
 Base = declarative_base()
 
+# Actions accepted by NotesCore.find_duplicates
+DEDUP_ACTIONS = ("report", "merge", "delete")
+
+# Fields NotesCore.search_notes can return, the default for the core API,
+# and the default for the /query endpoint
+SEARCH_FIELDS = ("id", "title", "content", "snippet", "created", "updated")
+DEFAULT_SEARCH_FIELDS = ("id", "title", "content")
+API_SEARCH_FIELDS = ("id", "title", "content", "created", "updated")
+
+# Marks where a snippet cuts into the note
+SNIPPET_ELLIPSIS = "..."
+
 class Note(Base):
     """Database model for notes."""
     __tablename__ = 'notes'
@@ -32,6 +51,111 @@ class Note(Base):
     updated = Column(DateTime)
 
 
+# Model instance owned by an encoder worker process
+_worker_model = None
+
+
+def _init_encode_worker(model_name: str) -> None:
+    """Load the embedding model once per encoder worker process."""
+    global _worker_model
+    import torch
+    # One intra-op thread per process so workers don't oversubscribe the cores
+    torch.set_num_threads(1)
+    _worker_model = SentenceTransformer(model_name)
+
+
+def _encode_chunk(texts: List[str]) -> np.ndarray:
+    """Encode a chunk of texts inside an encoder worker process."""
+    embeddings = _worker_model.encode(texts, batch_size=ENCODE_BATCH_SIZE)
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def resolve_search_fields(
+    fields: Optional[List[str]] = None,
+    snippet_chars: Optional[int] = None,
+    default: tuple = DEFAULT_SEARCH_FIELDS,
+) -> List[str]:
+    """Validate requested search fields, or fall back to default.
+
+    When snippet_chars is given, the default returns 'snippet' in place of
+    the full 'content'.
+    """
+    if fields is None:
+        fields = list(default)
+        if snippet_chars is not None:
+            fields = [field for field in fields if field != "content"] + ["snippet"]
+    if not fields:
+        raise ValueError("fields must not be empty")
+    unknown = set(fields) - set(SEARCH_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    if "snippet" in fields and snippet_chars is None:
+        raise ValueError("snippet_chars is required to return snippets")
+    if snippet_chars is not None and snippet_chars < 1:
+        raise ValueError("snippet_chars must be at least 1")
+    return list(fields)
+
+
+def _extract_snippet(content: str, query: str, max_chars: int) -> str:
+    """Return at most max_chars of content around the passage richest in query terms.
+
+    The window is trimmed to whole words and marked with SNIPPET_ELLIPSIS where
+    it cuts the note. A word longer than the window, or a window too short to
+    hold the markers, is cut hard.
+    """
+    if len(content) <= max_chars:
+        return content
+    marker = len(SNIPPET_ELLIPSIS)
+    if max_chars <= 2 * marker:
+        return content[:max_chars]
+
+    # Leave room for a marker on both sides of the text
+    width = max_chars - 2 * marker
+
+    terms = {term for term in re.findall(r"\w+", query.lower()) if len(term) > 2}
+    matches = []
+    if terms:
+        pattern = re.compile(
+            r"\b(?:" + "|".join(re.escape(term) for term in terms) + r")\b", re.IGNORECASE
+        )
+        matches = [match.start() for match in pattern.finditer(content)]
+
+    start = 0
+    best_pos = 0
+    if matches:
+        # Slide a window over the match positions and keep the densest one
+        best_count, best_pos, j = 0, matches[0], 0
+        for i, pos in enumerate(matches):
+            while j < len(matches) and matches[j] < pos + width:
+                j += 1
+            if j - i > best_count:
+                best_count, best_pos = j - i, pos
+        # Lead in a little so the first match has some context
+        start = max(0, min(best_pos - width // 4, len(content) - width))
+    if start == 0:
+        # No leading marker needed
+        width = max_chars - marker
+    end = min(len(content), start + width)
+
+    # Drop words cut in half at either edge
+    text_start, text_end = start, end
+    if start > 0 and not content[start - 1].isspace():
+        space = content.find(" ", start, best_pos)
+        if space != -1:
+            text_start = space + 1
+    if end < len(content) and not content[end].isspace():
+        space = content.rfind(" ", text_start, end)
+        if space > text_start:
+            text_end = space
+
+    snippet = content[text_start:text_end].strip() or content[start:end].strip()
+    if start > 0:
+        snippet = SNIPPET_ELLIPSIS + snippet
+    if end < len(content):
+        snippet += SNIPPET_ELLIPSIS
+    return snippet
+
+
 class NotesCore:
     """Core functionality for notes management, indexing, and querying."""
     
@@ -76,8 +200,17 @@ class NotesCore:
         finally:
             session.close()
     
-    def build_index(self) -> None:
-        """Build FAISS index from notes in the database."""
+    def build_index(self, workers: int = 1, chunk_size: int = ENCODE_CHUNK_SIZE) -> None:
+        """Build FAISS index from notes in the database.
+
+        With workers > 1, chunks of notes are encoded in a pool of worker
+        processes and added to the index in their original order.
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+
         session = self.Session()
 
         try:
@@ -91,27 +224,25 @@ class NotesCore:
             # Create FAISS index
             index = faiss.IndexFlatL2(EMBEDDING_DIM)
             note_ids = []
-            embeddings = []
+            note_chunks = [
+                notes[i:i + chunk_size] for i in range(0, len(notes), chunk_size)
+            ]
+            texts = ([note.content for note in chunk] for chunk in note_chunks)
             
-            # Process each note
-            for note in notes:
-                # Generate embedding
-                embedding = self.model.encode(note.content)
-                embeddings.append(embedding)
-                note_ids.append(note.id)
-                # Store embedding in database
-                note.embedding = json.dumps(embedding.tolist())
+            # Encode chunk by chunk; results arrive in the same order as note_chunks
+            for chunk_num, embeddings in enumerate(self._encode_chunks(texts, workers)):
+                for note, embedding in zip(note_chunks[chunk_num], embeddings):
+                    note_ids.append(note.id)
+                    # Store embedding in database
+                    note.embedding = json.dumps(embedding.tolist())
+                # Add to FAISS index
+                index.add(embeddings)
             
             # Save changes to database
             session.commit()
             
-            # Add to FAISS index
-            index.add(np.array(embeddings, dtype=np.float32))
-            
             # Save FAISS index and note IDs mapping
-            faiss.write_index(index, FAISS_INDEX_PATH)
-            with open("faiss_ids.json", "w") as f:
-                json.dump(note_ids, f)
+            self._save_index(index, note_ids)
                 
             print(f"Successfully built index for {len(notes)} notes")
             
@@ -121,8 +252,47 @@ class NotesCore:
         finally:
             session.close()
     
-    def search_notes(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
-        """Search notes using FAISS index and return top k results."""
+    def _encode_chunks(self, chunks: Iterator[List[str]], workers: int = 1) -> Iterator[np.ndarray]:
+        """Encode chunks of texts, yielding one float32 array per chunk in order."""
+        if workers <= 1:
+            for texts in chunks:
+                embeddings = self.model.encode(texts, batch_size=ENCODE_BATCH_SIZE)
+                yield np.asarray(embeddings, dtype=np.float32)
+            return
+
+        # spawn avoids forking a parent that already holds torch threads
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_encode_worker,
+            initargs=(MODEL_NAME,),
+        ) as pool:
+            # Keep at most two chunks per worker in flight to bound memory
+            pending = deque()
+            for texts in chunks:
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+                pending.append(pool.submit(_encode_chunk, texts))
+            while pending:
+                yield pending.popleft().result()
+    
+    def search_notes(
+        self,
+        query: str,
+        k: int = 5,
+        fields: Optional[List[str]] = None,
+        snippet_chars: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Search notes using FAISS index and return top k results.
+
+        fields selects which keys each result carries (see SEARCH_FIELDS).
+        When snippet_chars is given, results carry a 'snippet' of at most that
+        many characters around the passage that best matches the query, in
+        place of the full content unless fields asks for both.
+        """
+        fields = resolve_search_fields(fields, snippet_chars)
+
         # Load index and note IDs
         index = self._load_index()
         note_ids = self._load_note_ids()
@@ -134,31 +304,211 @@ class NotesCore:
         distances, indices = index.search(
             np.array([query_embedding], dtype=np.float32), k
         )
+        # FAISS returns -1 for empty indices
+        hit_ids = [note_ids[idx] for idx in indices[0] if 0 <= idx < len(note_ids)]
+        if not hit_ids:
+            return []
         
-        # Get notes from database
+        # Fetch only the columns the requested fields need, in one query
+        columns = [Note.id]
+        if "title" in fields:
+            columns.append(Note.title)
+        if "content" in fields or "snippet" in fields:
+            columns.append(Note.content)
+        if "created" in fields:
+            columns.append(Note.created)
+        if "updated" in fields:
+            columns.append(Note.updated)
+
         session = self.Session()
         try:
-            results = []
-            for idx in indices[0]:
-                if idx >= 0 and idx < len(note_ids):  # FAISS returns -1 for empty indices
-                    note_id = note_ids[idx]
-                    note = session.query(Note).get(note_id)
-                    if note:
-                        results.append({
-                            'id': note.id,
-                            'title': note.title,
-                            'content': note.content
-                        })
-            return results
+            rows = {
+                row.id: row
+                for row in session.query(*columns).filter(Note.id.in_(hit_ids)).all()
+            }
         finally:
             session.close()
+
+        results = []
+        for note_id in hit_ids:
+            row = rows.get(note_id)
+            if row is None:
+                continue
+            result = {}
+            for field in fields:
+                if field == "snippet":
+                    result[field] = _extract_snippet(row.content, query, snippet_chars)
+                else:
+                    result[field] = getattr(row, field)
+            results.append(result)
+        return results
+    
+    def find_duplicates(
+        self,
+        threshold: float = DEDUP_THRESHOLD,
+        k: int = DEDUP_K,
+        action: str = "report",
+    ) -> List[Dict[str, Any]]:
+        """Find clusters of near-duplicate notes using the stored embeddings.
+
+        Runs one batched self-kNN search over the index. Notes are visited in
+        ID order; each note not yet claimed is kept and claims its unclaimed
+        neighbours with cosine similarity of at least threshold, so every
+        reported duplicate is that close to its kept note. Notes edited or
+        deleted since the last build are skipped. With action="delete" the
+        duplicates are removed; with action="merge" their distinct content is
+        appended to the kept note first. Both update the database and the
+        index without a full rebuild.
+        """
+        if action not in DEDUP_ACTIONS:
+            raise ValueError(f"action must be one of {', '.join(DEDUP_ACTIONS)}")
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be greater than 0 and at most 1")
+        if k < 1:
+            raise ValueError("k must be at least 1")
+
+        index = self._load_index()
+        note_ids = self._load_note_ids()
+        n = min(index.ntotal, len(note_ids))
+        if n < 2:
+            return []
+
+        # Cosine similarity is inner product over normalized vectors
+        vectors = index.reconstruct_n(0, n)
+        faiss.normalize_L2(vectors)
+        ip_index = faiss.IndexFlatIP(vectors.shape[1])
+        ip_index.add(vectors)
+        # k + 1 because every note is its own nearest neighbour
+        similarities, neighbours = ip_index.search(vectors, min(k + 1, n))
+
+        rows = np.arange(n)[:, None]
+        mask = (similarities >= threshold) & (neighbours >= 0) & (neighbours != rows)
+        pair_rows, pair_cols = np.nonzero(mask)
+
+        # kNN lists are not symmetric, so record each similar pair both ways
+        similar: Dict[int, Dict[int, float]] = {}
+        for row, col, sim in zip(
+            pair_rows.tolist(),
+            neighbours[pair_rows, pair_cols].tolist(),
+            similarities[pair_rows, pair_cols].tolist(),
+        ):
+            similar.setdefault(row, {})[col] = sim
+            similar.setdefault(col, {})[row] = sim
+
+        session = self.Session()
+        try:
+            involved = [note_ids[pos] for pos in similar]
+            notes = {
+                note.id: note
+                for note in session.query(Note).filter(Note.id.in_(involved)).all()
+            }
+            # Skip notes deleted since the build, and notes edited since the build
+            # (their embedding is cleared) whose index vector no longer matches
+            valid = {
+                pos for pos in similar
+                if note_ids[pos] in notes and notes[note_ids[pos]].embedding
+            }
+
+            clusters = []
+            claimed = set()
+            for keep_pos in sorted(valid, key=lambda pos: note_ids[pos]):
+                if keep_pos in claimed:
+                    continue
+                members = sorted(
+                    (pos for pos in similar[keep_pos] if pos in valid and pos not in claimed),
+                    key=lambda pos: note_ids[pos],
+                )
+                if not members:
+                    continue
+                claimed.add(keep_pos)
+                claimed.update(members)
+                keep = notes[note_ids[keep_pos]]
+                clusters.append({
+                    'keep': {'id': keep.id, 'title': keep.title},
+                    'duplicates': [
+                        {
+                            'id': note_ids[pos],
+                            'title': notes[note_ids[pos]].title,
+                            'similarity': similar[keep_pos][pos],
+                        }
+                        for pos in members
+                    ],
+                })
+
+            if action != "report" and clusters:
+                self._remove_duplicates(session, clusters, notes, index, note_ids, action)
+            return clusters
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _remove_duplicates(self, session, clusters, notes, index, note_ids, action) -> None:
+        """Delete or merge duplicate notes and update the index incrementally."""
+        positions = {note_id: pos for pos, note_id in enumerate(note_ids)}
+        removed = set()
+        merged = []
+
+        for cluster in clusters:
+            keep = notes[cluster['keep']['id']]
+            seen = {keep.content.strip()}
+            for duplicate in cluster['duplicates']:
+                note = notes[duplicate['id']]
+                content = note.content.strip()
+                if action == "merge" and content not in seen:
+                    keep.content = f"{keep.content}\n\n{note.content}"
+                    seen.add(content)
+                session.delete(note)
+                removed.add(positions[note.id])
+            if len(seen) > 1:
+                # Merged notes need a fresh embedding at the end of the index
+                keep.updated = datetime.utcnow()
+                merged.append(keep)
+                removed.add(positions[keep.id])
+
+        # IndexFlat compacts on removal, so surviving entries keep their order
+        index.remove_ids(np.array(sorted(removed), dtype=np.int64))
+        note_ids = [note_id for pos, note_id in enumerate(note_ids) if pos not in removed]
+
+        if merged:
+            embeddings = np.asarray(
+                self.model.encode([note.content for note in merged], batch_size=ENCODE_BATCH_SIZE),
+                dtype=np.float32,
+            )
+            for note, embedding in zip(merged, embeddings):
+                note.embedding = json.dumps(embedding.tolist())
+                note_ids.append(note.id)
+            index.add(embeddings)
+
+        session.commit()
+        self._save_index(index, note_ids)
+
+    def format_duplicates(self, clusters: List[Dict[str, Any]]) -> str:
+        """Format duplicate clusters for display."""
+        if not clusters:
+            return "No duplicate notes found."
+        formatted = f"Found {len(clusters)} duplicate clusters:\n"
+        for i, cluster in enumerate(clusters, 1):
+            keep = cluster['keep']
+            formatted += f"\n{i}. Keep [{keep['id']}] {keep['title']}\n"
+            for duplicate in cluster['duplicates']:
+                formatted += (
+                    f"   - [{duplicate['id']}] {duplicate['title']} "
+                    f"(similarity {duplicate['similarity']:.3f})\n"
+                )
+        return formatted
     
     def format_results(self, query: str, results: List[Dict[str, Any]]) -> str:
         """Format search results for display."""
         formatted = f"Query: {query}\n\nRelevant Notes:\n"
         for i, result in enumerate(results, 1):
-            formatted += f"\n{i}. {result['title']}\n"
-            formatted += f"Content: {result['content']}\n"
+            title = result.get('title', f"Note {result.get('id', '')}".strip())
+            formatted += f"\n{i}. {title}\n"
+            if 'snippet' in result:
+                formatted += f"Snippet: {result['snippet']}\n"
+            elif 'content' in result:
+                formatted += f"Content: {result['content']}\n"
         return formatted
     
     def _load_index(self):
@@ -170,6 +520,12 @@ class NotesCore:
             )
         return faiss.read_index(FAISS_INDEX_PATH)
     
+    def _save_index(self, index, note_ids: List[int]) -> None:
+        """Write the FAISS index and its note ID mapping to disk."""
+        faiss.write_index(index, FAISS_INDEX_PATH)
+        with open("faiss_ids.json", "w") as f:
+            json.dump(note_ids, f)
+    
     def _load_note_ids(self):
         """Load the FAISS to DB note ID mapping."""
         id_path = Path("faiss_ids.json")
@@ -1,16 +1,39 @@
 import argparse
 import sys
 
-from notes_core import NotesCore
+from config import ENCODE_CHUNK_SIZE, DEDUP_THRESHOLD, DEDUP_K
+from notes_core import NotesCore, DEDUP_ACTIONS
 
 def main():
     parser = argparse.ArgumentParser(description='Notes Manager - Semantic Search for Notes')
     parser.add_argument('--load', action='store_true', help='Load notes from JSON to database')
     parser.add_argument('--build-index', action='store_true', help='Build semantic search index')
+    parser.add_argument('--workers', type=int, default=1, help='Encoder processes to use with --build-index (default: 1)')
+    parser.add_argument('--chunk-size', type=int, default=ENCODE_CHUNK_SIZE,
+                        help=f'Notes per encoder chunk with --build-index (default: {ENCODE_CHUNK_SIZE})')
+    parser.add_argument('--dedup', action='store_true', help='Find near-duplicate notes in the index')
+    parser.add_argument('--dedup-threshold', type=float, default=DEDUP_THRESHOLD,
+                        help=f'Cosine similarity at which notes count as duplicates (default: {DEDUP_THRESHOLD})')
+    parser.add_argument('--dedup-k', type=int, default=DEDUP_K,
+                        help=f'Neighbours examined per note with --dedup (default: {DEDUP_K})')
+    parser.add_argument('--dedup-action', choices=DEDUP_ACTIONS, default='report',
+                        help='Report duplicates, or merge/delete them and update the index (default: report)')
     parser.add_argument('--query', type=str, help='Query notes (interactive if not provided)')
     parser.add_argument('--k', type=int, default=5, help='Number of results to return (default: 5)')
+    parser.add_argument('--snippet', type=int, metavar='CHARS',
+                        help='Show a snippet of up to CHARS characters instead of full note content')
     
     args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    if args.dedup_k < 1:
+        parser.error("--dedup-k must be at least 1")
+    if not 0 < args.dedup_threshold <= 1:
+        parser.error("--dedup-threshold must be greater than 0 and at most 1")
+    if args.snippet is not None and args.snippet < 1:
+        parser.error("--snippet must be at least 1")
 
     # If no arguments provided, show help
     if not any(vars(args).values()):
@@ -33,11 +56,26 @@ def main():
     # Build index
     if args.build_index:
         print("Building semantic search index...")
-        core.build_index()
+        core.build_index(workers=args.workers, chunk_size=args.chunk_size)
         print("Done building index.")
 
+    # Find duplicate notes
+    if args.dedup:
+        print("Searching for duplicate notes...")
+        try:
+            clusters = core.find_duplicates(
+                threshold=args.dedup_threshold, k=args.dedup_k, action=args.dedup_action
+            )
+        except FileNotFoundError as e:
+            print(f"Error: {e}")
+            print("Please run '--build-index' first.")
+            sys.exit(1)
+        print(core.format_duplicates(clusters))
+        if clusters and args.dedup_action != 'report':
+            print(f"Done: duplicates {'merged' if args.dedup_action == 'merge' else 'deleted'} and index updated.")
+
     # Query notes - only if query is explicitly provided or if no other actions were taken
-    if args.query is not None or (not args.load and not args.build_index):
+    if args.query is not None or (not args.load and not args.build_index and not args.dedup):
         try:
             # If query provided as argument, use it
             if args.query:
@@ -50,7 +88,7 @@ def main():
                     if query.lower() in ['quit', 'exit', 'q']:
                         break
                     
-                    results = core.search_notes(query, k=args.k)
+                    results = core.search_notes(query, k=args.k, snippet_chars=args.snippet)
                     
                     if not results:
                         print("No relevant notes found.")
@@ -63,7 +101,7 @@ def main():
                 return
 
             # Process single query
-            results = core.search_notes(query, k=args.k)
+            results = core.search_notes(query, k=args.k, snippet_chars=args.snippet)
             
             if not results:
                 print("No relevant notes found.")
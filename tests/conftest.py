@@ -0,0 +1,79 @@
+import json
+import sys
+from pathlib import Path
+
+import faiss
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Import notes_core from parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+import notes_core
+from notes_core import Base, Note, NotesCore
+
+DIM = 4
+
+
+class FakeModel:
+    """Stands in for SentenceTransformer with fixed embeddings per text."""
+
+    def __init__(self, vectors=None):
+        self.vectors = vectors or {}
+
+    def encode(self, texts, batch_size=None):
+        fallback = np.full(DIM, 0.5, dtype=np.float32)
+        if isinstance(texts, str):
+            return np.asarray(self.vectors.get(texts, fallback), dtype=np.float32)
+        return np.array(
+            [self.vectors.get(text, fallback) for text in texts], dtype=np.float32
+        )
+
+
+@pytest.fixture
+def core(tmp_path, monkeypatch):
+    """NotesCore backed by a temporary database and index, without loading a model."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(notes_core, "FAISS_INDEX_PATH", str(tmp_path / "notes_index.faiss"))
+
+    core = NotesCore.__new__(NotesCore)
+    core.model = FakeModel()
+    core.engine = create_engine(f"sqlite:///{tmp_path / 'notes.db'}")
+    core.Session = sessionmaker(bind=core.engine)
+    Base.metadata.create_all(core.engine)
+    return core
+
+
+@pytest.fixture
+def add_indexed_notes(core):
+    """Store (title, content, vector) notes and build an index over them."""
+
+    def add(notes):
+        session = core.Session()
+        index = faiss.IndexFlatL2(DIM)
+        note_ids = []
+        for title, content, vector in notes:
+            note = Note(title=title, content=content, embedding=json.dumps(list(vector)))
+            session.add(note)
+            session.flush()
+            note_ids.append(note.id)
+            index.add(np.array([vector], dtype=np.float32))
+        session.commit()
+        session.close()
+        core._save_index(index, note_ids)
+        return note_ids
+
+    return add
+
+
+@pytest.fixture
+def client(core, tmp_path, monkeypatch):
+    """TestClient for api.app, serving from the temporary core."""
+    # api builds its own NotesCore at import; keep it off the real model and database
+    monkeypatch.setattr(notes_core, "SentenceTransformer", lambda name: FakeModel())
+    monkeypatch.setattr(notes_core, "DB_URL", f"sqlite:///{tmp_path / 'api.db'}")
+    import api
+    monkeypatch.setattr(api, "notes_core", core)
+    return TestClient(api.app)
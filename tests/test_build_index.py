@@ -0,0 +1,110 @@
+import json
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+import notes_core
+from notes_core import Note
+
+from conftest import DIM
+
+
+class LazyFuture(Future):
+    """Future whose work runs on result(), completing later futures first."""
+
+    def __init__(self, executor, fn, args):
+        super().__init__()
+        self.executor = executor
+        self.fn = fn
+        self.args = args
+
+    def run(self):
+        if not self.done():
+            self.set_result(self.fn(*self.args))
+
+    def result(self, timeout=None):
+        # Finish everything submitted after this future first, so results
+        # complete out of order and the caller must restore submission order
+        for future in reversed(self.executor.futures):
+            future.run()
+        self.executor.consumed += 1
+        return super().result(timeout)
+
+
+class FakeExecutor:
+    """In-process stand-in for ProcessPoolExecutor that tracks in-flight work."""
+
+    instances = []
+
+    def __init__(self, max_workers, mp_context=None, initializer=None, initargs=()):
+        self.max_workers = max_workers
+        self.futures = []
+        self.consumed = 0
+        self.max_in_flight = 0
+        FakeExecutor.instances.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, fn, *args):
+        future = LazyFuture(self, fn, args)
+        self.futures.append(future)
+        self.max_in_flight = max(self.max_in_flight, len(self.futures) - self.consumed)
+        return future
+
+
+@pytest.fixture
+def notes(core, monkeypatch):
+    """Store notes whose fake embeddings encode their position."""
+    monkeypatch.setattr(notes_core, "EMBEDDING_DIM", DIM)
+    session = core.Session()
+    contents = [f"note {i}" for i in range(23)]
+    for i, content in enumerate(contents):
+        core.model.vectors[content] = [float(i), 0.0, 0.0, 0.0]
+        session.add(Note(title=content, content=content, embedding=''))
+    session.commit()
+    ids = [note.id for note in session.query(Note).order_by(Note.id).all()]
+    session.close()
+    return ids
+
+
+def assert_index_in_note_order(core, ids):
+    index = core._load_index()
+    note_ids = core._load_note_ids()
+    assert note_ids == ids
+    assert index.ntotal == len(ids)
+    np.testing.assert_allclose(index.reconstruct_n(0, len(ids))[:, 0], range(len(ids)))
+
+    session = core.Session()
+    for i, note_id in enumerate(ids):
+        assert json.loads(session.get(Note, note_id).embedding)[0] == i
+    session.close()
+
+
+def test_serial_chunks_keep_note_order(core, notes):
+    core.build_index(chunk_size=5)
+
+    assert_index_in_note_order(core, notes)
+
+
+def test_parallel_chunks_keep_note_order(core, notes, monkeypatch):
+    FakeExecutor.instances = []
+    monkeypatch.setattr(notes_core, "ProcessPoolExecutor", FakeExecutor)
+    monkeypatch.setattr(notes_core, "_worker_model", core.model)
+
+    core.build_index(workers=2, chunk_size=3)
+
+    assert_index_in_note_order(core, notes)
+    (executor,) = FakeExecutor.instances
+    assert len(executor.futures) == 8
+    assert executor.max_in_flight <= 2 * 2
+
+
+@pytest.mark.parametrize("kwargs", [{"workers": 0}, {"chunk_size": 0}])
+def test_invalid_build_options(core, kwargs):
+    with pytest.raises(ValueError):
+        core.build_index(**kwargs)
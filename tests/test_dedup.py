@@ -0,0 +1,142 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+from notes_core import Note
+
+
+def angled(theta):
+    """Unit vector at angle theta in the first two dimensions."""
+    return [math.cos(theta), math.sin(theta), 0.0, 0.0]
+
+
+def load_index(core):
+    index = core._load_index()
+    note_ids = core._load_note_ids()
+    return index, note_ids
+
+
+def test_identical_vectors_cluster(core, add_indexed_notes):
+    a, b, c = add_indexed_notes([
+        ("a", "flight at 9am", [1, 0, 0, 0]),
+        ("b", "flight at 9am", [1, 0, 0, 0]),
+        ("c", "groceries", [0, 0, 1, 0]),
+    ])
+
+    clusters = core.find_duplicates(threshold=0.95)
+
+    assert len(clusters) == 1
+    assert clusters[0]['keep'] == {'id': a, 'title': 'a'}
+    assert [d['id'] for d in clusters[0]['duplicates']] == [b]
+    assert clusters[0]['duplicates'][0]['similarity'] == pytest.approx(1.0)
+
+
+def test_chained_notes_are_not_clustered_with_keeper(core, add_indexed_notes):
+    # sim(a, b) = sim(b, c) = cos(0.3) ~ 0.955, sim(a, c) = cos(0.6) ~ 0.825
+    a, b, c = add_indexed_notes([
+        ("a", "a", angled(0.0)),
+        ("b", "b", angled(0.3)),
+        ("c", "c", angled(0.6)),
+    ])
+
+    clusters = core.find_duplicates(threshold=0.95, action="delete")
+
+    assert len(clusters) == 1
+    assert clusters[0]['keep']['id'] == a
+    assert [d['id'] for d in clusters[0]['duplicates']] == [b]
+    assert all(d['similarity'] >= 0.95 for d in clusters[0]['duplicates'])
+
+    session = core.Session()
+    assert sorted(note.id for note in session.query(Note).all()) == [a, c]
+    session.close()
+
+
+def test_stale_index_entries_are_skipped(core, add_indexed_notes):
+    a, b, c = add_indexed_notes([
+        ("a", "same", [1, 0, 0, 0]),
+        ("b", "same", [1, 0, 0, 0]),
+        ("c", "same", [1, 0, 0, 0]),
+    ])
+    session = core.Session()
+    # a was deleted and b was edited after the index was built
+    session.delete(session.get(Note, a))
+    edited = session.get(Note, b)
+    edited.content = "something else now"
+    edited.embedding = ''
+    session.commit()
+    session.close()
+
+    assert core.find_duplicates(threshold=0.95, action="delete") == []
+
+    session = core.Session()
+    assert sorted(note.id for note in session.query(Note).all()) == [b, c]
+    session.close()
+
+
+def test_delete_keeps_index_aligned(core, add_indexed_notes):
+    a, b, c, d = add_indexed_notes([
+        ("a", "same", [1, 0, 0, 0]),
+        ("b", "other", [0, 1, 0, 0]),
+        ("c", "same", [1, 0, 0, 0]),
+        ("d", "third", [0, 0, 1, 0]),
+    ])
+
+    clusters = core.find_duplicates(threshold=0.95, action="delete")
+
+    assert [dup['id'] for dup in clusters[0]['duplicates']] == [c]
+    index, note_ids = load_index(core)
+    assert note_ids == [a, b, d]
+    assert index.ntotal == len(note_ids)
+    np.testing.assert_allclose(index.reconstruct(1), [0, 1, 0, 0])
+
+    session = core.Session()
+    assert session.get(Note, c) is None
+    session.close()
+
+
+def test_merge_reencodes_keeper_at_end_of_index(core, add_indexed_notes):
+    a, b, c = add_indexed_notes([
+        ("a", "flight at 9am", angled(0.0)),
+        ("b", "groceries", [0, 0, 1, 0]),
+        ("c", "flight at 9am, gate 12", angled(0.1)),
+    ])
+    merged_vector = [0.0, 0.0, 0.0, 1.0]
+    core.model.vectors["flight at 9am\n\nflight at 9am, gate 12"] = merged_vector
+
+    core.find_duplicates(threshold=0.95, action="merge")
+
+    index, note_ids = load_index(core)
+    assert note_ids == [b, a]
+    assert index.ntotal == len(note_ids)
+    np.testing.assert_allclose(index.reconstruct(1), merged_vector)
+
+    session = core.Session()
+    keep = session.get(Note, a)
+    assert keep.content == "flight at 9am\n\nflight at 9am, gate 12"
+    assert json.loads(keep.embedding) == merged_vector
+    assert session.get(Note, c) is None
+    session.close()
+
+
+@pytest.mark.parametrize("threshold", [-1, 0, 1.5])
+def test_threshold_out_of_range(core, add_indexed_notes, threshold):
+    add_indexed_notes([("a", "a", [1, 0, 0, 0]), ("b", "b", [0, 1, 0, 0])])
+
+    with pytest.raises(ValueError):
+        core.find_duplicates(threshold=threshold, action="delete")
+
+
+def test_dedup_endpoint_allows_null_titles(client, add_indexed_notes):
+    a, b = add_indexed_notes([
+        (None, "same", [1, 0, 0, 0]),
+        (None, "same", [1, 0, 0, 0]),
+    ])
+
+    response = client.post("/dedup", json={"threshold": 0.95, "action": "delete"})
+
+    assert response.status_code == 200
+    cluster = response.json()["clusters"][0]
+    assert cluster["keep"] == {"id": a, "title": None}
+    assert cluster["duplicates"][0]["id"] == b
@@ -0,0 +1,111 @@
+from typing import get_args
+
+import pytest
+
+from notes_core import (
+    DEDUP_ACTIONS, SEARCH_FIELDS, SNIPPET_ELLIPSIS, _extract_snippet, resolve_search_fields,
+)
+
+FILLER = "lorem ipsum dolor sit amet " * 20
+TEXT = (
+    FILLER
+    + "my flight to Boston departs at 9am on Friday, flight number UA123. "
+    + "more filler words here " * 20
+)
+
+
+def words(text):
+    return text.replace(SNIPPET_ELLIPSIS, " ").split()
+
+
+def test_short_content_is_returned_whole():
+    assert _extract_snippet("short note", "note", 50) == "short note"
+
+
+@pytest.mark.parametrize("max_chars", [20, 40, 60, 120])
+def test_snippet_centres_on_densest_matches(max_chars):
+    snippet = _extract_snippet(TEXT, "when is my flight", max_chars)
+
+    assert len(snippet) <= max_chars
+    assert "flight" in snippet
+    assert snippet.startswith(SNIPPET_ELLIPSIS)
+    assert snippet.endswith(SNIPPET_ELLIPSIS)
+
+
+@pytest.mark.parametrize("max_chars", [14, 25, 60, 120])
+def test_snippet_keeps_whole_words(max_chars):
+    snippet = _extract_snippet(TEXT, "flight", max_chars)
+
+    assert len(snippet) <= max_chars
+    assert set(words(snippet)) <= set(TEXT.split())
+
+
+def test_snippet_without_matches_starts_at_beginning():
+    snippet = _extract_snippet(TEXT, "zzz", 50)
+
+    assert len(snippet) <= 50
+    assert snippet.startswith("lorem ipsum")
+    assert snippet.endswith(SNIPPET_ELLIPSIS)
+
+
+def test_tiny_snippet_is_cut_hard():
+    assert _extract_snippet(TEXT, "flight", 1) == "l"
+    # Four characters of room between the markers cannot hold "flight"
+    assert _extract_snippet(TEXT, "flight", 10) == "...fli..."
+
+
+def test_resolve_search_fields():
+    assert resolve_search_fields() == ["id", "title", "content"]
+    assert resolve_search_fields(snippet_chars=80) == ["id", "title", "snippet"]
+    assert resolve_search_fields(["content", "snippet"], 80) == ["content", "snippet"]
+    with pytest.raises(ValueError):
+        resolve_search_fields([])
+    with pytest.raises(ValueError):
+        resolve_search_fields(["snippet"])
+
+
+def test_format_results_with_projected_fields(core):
+    formatted = core.format_results("q", [{'id': 3, 'snippet': "...flight..."}])
+
+    assert "1. Note 3" in formatted
+    assert "Snippet: ...flight..." in formatted
+
+
+def test_query_snippet_mode_replaces_content(client, add_indexed_notes):
+    (note_id,) = add_indexed_notes([("flight", TEXT, [0.5, 0.5, 0.5, 0.5])])
+
+    response = client.post("/query", json={"question": "my flight", "snippet_chars": 40})
+
+    assert response.status_code == 200
+    (reference,) = response.json()["references"]
+    assert set(reference) == {"id", "title", "snippet"}
+    assert reference["id"] == note_id
+    assert "flight" in reference["snippet"]
+    assert len(reference["snippet"]) <= 40
+
+
+def test_query_projection(client, add_indexed_notes):
+    add_indexed_notes([("flight", TEXT, [0.5, 0.5, 0.5, 0.5])])
+
+    response = client.post("/query", json={"question": "flight", "fields": ["title"]})
+
+    assert response.json()["references"] == [{"title": "flight"}]
+
+
+@pytest.mark.parametrize("body", [
+    {"fields": []},
+    {"fields": ["snippet"]},
+    {"fields": ["bogus"]},
+    {"snippet_chars": 0},
+])
+def test_query_rejects_invalid_options(client, body):
+    response = client.post("/query", json={"question": "flight", **body})
+
+    assert response.status_code == 422
+
+
+def test_api_literals_match_core(client):
+    import api
+
+    assert get_args(api.SearchField) == SEARCH_FIELDS
+    assert get_args(api.DedupRequest.model_fields["action"].annotation) == DEDUP_ACTIONS